@@ -1,18 +1,61 @@
 # mollusk/__init__.py
+import atexit
+import functools
 import importlib.util
 import logging
+import os
+import queue
+import threading
 import types
 from importlib import import_module
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from types import ModuleType
 
+
+class _LazyQueueHandler(QueueHandler):
+    """QueueHandler whose listener thread is started by the first record it queues.
+
+    Importing mollusk therefore does not start a thread, and a forked child, which
+    inherits no running listener, starts its own with an empty queue.
+    """
+
+    def __init__(self, *handlers: logging.Handler) -> None:
+        super().__init__(queue.SimpleQueue())
+        self.target_handlers = handlers
+        self.listener = None
+        self.listener_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset_in_child)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.listener is None:
+            self._start_listener()
+        super().enqueue(record)
+
+    def _start_listener(self) -> None:
+        with self.listener_lock:
+            if self.listener is None:
+                listener = QueueListener(
+                    self.queue, *self.target_handlers, respect_handler_level=True
+                )
+                listener.start()
+                atexit.register(listener.stop)
+                self.listener = listener
+
+    def _reset_in_child(self) -> None:
+        self.queue = queue.SimpleQueue()
+        self.listener = None
+        self.listener_lock = threading.Lock()
+
+
 logger = logging.getLogger("mollusk")
 logger.setLevel(logging.DEBUG)
 if not logger.handlers:
     handler = logging.StreamHandler()
     formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    # log calls only enqueue records; a background thread writes them to the stream
+    logger.addHandler(_LazyQueueHandler(handler))
 
 
 # Settings will be populated here
@@ -29,19 +72,25 @@ def _import_default_settings() -> ModuleType:
 
 
 def _find_repository_settings() -> ModuleType | None:
-    """Look for settings.py in the current directory or parents."""
-    cwd = Path.cwd()
+    """Look for settings.py at MOLLUSK_SETTINGS_PATH, else in the cwd or its parents."""
+    env_settings_path = os.environ.get("MOLLUSK_SETTINGS_PATH")
+    if env_settings_path and Path(env_settings_path).is_file():
+        return _import_settings_from_path(Path(env_settings_path))
 
-    # Check current directory
-    settings_path = cwd / "settings.py"
-    if settings_path.exists():
+    settings_path = _search_settings_path(Path.cwd())
+    if settings_path:
         return _import_settings_from_path(settings_path)
 
-    # Check parent directories
-    for parent in cwd.parents:
-        settings_path = parent / "settings.py"
+    return None
+
+
+@functools.cache
+def _search_settings_path(cwd: Path) -> Path | None:
+    """Return the nearest settings.py in a directory or its parents, memoized."""
+    for directory in (cwd, *cwd.parents):
+        settings_path = directory / "settings.py"
         if settings_path.exists():
-            return _import_settings_from_path(settings_path)
+            return settings_path
 
     return None
 
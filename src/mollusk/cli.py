@@ -1,7 +1,5 @@
 # mollusk/cli.py
 import logging
-import shutil
-from importlib.resources import as_file, files
 from pathlib import Path
 
 import click
@@ -30,6 +28,9 @@ def ping() -> None:
 @click.option("--location", "-l", default=".", help="Repository creation location")
 def init(*, location: str) -> None:
     """Initialize a new Mollusk repository."""
+    import shutil
+    from importlib.resources import as_file, files
+
     repository_path = Path(location).resolve()
 
     if not repository_path.exists():
@@ -1,9 +1,14 @@
 import logging
-import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert, inspect, text, update
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from mollusk import settings
 
 logger = logging.getLogger(__name__)
 
@@ -22,20 +27,159 @@ class Database:
                                     If None, uses default location.
         """
         self.db_path = db_path
-        self.engine = create_engine(f"sqlite:///{db_path}", echo=False)
-        self.Session = sessionmaker(bind=self.engine)
+        if db_path == ":memory:":
+            # every pooled connection would get its own empty database, so share one
+            pool_args = {"poolclass": StaticPool}
+        else:
+            pool_args = {
+                "poolclass": QueuePool,
+                "pool_size": settings.DB_POOL_SIZE,
+                "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+                "pool_pre_ping": True,
+                # reuse the most recently returned connection, whose caches are warmest
+                "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+            }
+        self.engine = create_engine(
+            f"sqlite:///{db_path}",
+            echo=False,
+            connect_args={"check_same_thread": False, "cached_statements": 256},
+            **pool_args,
+        )
+        if db_path != ":memory:":
+            event.listen(self.engine, "connect", self._configure_connection)
+        # objects stay loaded after commit rather than being re-SELECTed on next access
+        self._session_factory = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.Session = scoped_session(self._session_factory)
+
+    @staticmethod
+    def _configure_connection(dbapi_connection, connection_record):
+        """
+        Tune each new connection to an on-disk SQLite database.
+
+        WAL journaling lets readers proceed alongside a writer and avoids a full fsync
+        of the database file per commit; the cache and mmap sizes keep a pooled
+        connection's pages warm between uses.  In-memory databases are left as is.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        cursor.close()
 
     def create_tables(self):
-        """Create all tables defined in the models."""
-        if not os.path.exists(self.db_path):
-            logger.info(f"Database not found, creating")
-            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        """
+        Create all tables defined in the models, upgrading existing ones in place.
+
+        Tables created by earlier versions get any missing columns and indexes, and
+        ids they stored as UUID strings are converted to 16-byte binary UUIDs.
+        """
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         Base.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            self._upgrade_tables(connection)
+        # create_all skips indexes on tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(self.engine, checkfirst=True)
+
+    @staticmethod
+    def _upgrade_tables(connection):
+        """Add missing columns and convert string UUIDs in tables that already exist."""
+        from mollusk.models import UUIDBinary  # models imports this module
+
+        inspector = inspect(connection)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    Database._add_column(connection, table.name, column)
+                if isinstance(column.type, UUIDBinary):
+                    Database._convert_string_uuids(connection, table.name, column.name)
+
+    @staticmethod
+    def _add_column(connection, table_name, column):
+        column_type = column.type.compile(dialect=connection.dialect)
+        logger.info(f"Adding column {table_name}.{column.name}")
+        connection.exec_driver_sql(
+            f'ALTER TABLE "{table_name}" ADD COLUMN "{column.name}" {column_type}'
+        )
+
+    @staticmethod
+    def _convert_string_uuids(connection, table_name, column_name):
+        string_ids = connection.execute(
+            text(
+                f'SELECT DISTINCT "{column_name}" FROM "{table_name}" '
+                f"WHERE typeof(\"{column_name}\") = 'text'"
+            )
+        ).scalars()
+        rows = [(uuid.UUID(value).bytes, value) for value in string_ids]
+        if rows:
+            logger.info(f"Converting {len(rows)} ids in {table_name}.{column_name}")
+            connection.exec_driver_sql(
+                f'UPDATE "{table_name}" SET "{column_name}" = ? '
+                f'WHERE "{column_name}" = ?',
+                rows,
+            )
 
     def get_session(self):
-        """Get a new database session."""
+        """Get the current thread's database session, creating it if needed."""
         return self.Session()
 
+    @contextmanager
+    def transaction(self):
+        """
+        Provide a session whose writes share a single transaction.
+
+        The transaction commits when the block exits and rolls back if it raises, so
+        bulk work pays for one commit instead of one per row.
+        """
+        with self._session_factory() as session, session.begin():
+            yield session
+
+    def insert_many(self, model, rows):
+        """
+        Insert many rows for a model with one executemany and a single commit.
+
+        Args:
+            model: ORM model class to insert into.
+            rows (list[dict]): Column values for each row.
+        """
+        if not rows:
+            return
+        with self.transaction() as session:
+            session.execute(insert(model), rows)
+
+    def update_many(self, model, rows):
+        """
+        Update many rows for a model by primary key, in a single commit.
+
+        Args:
+            model: ORM model class to update.
+            rows (list[dict]): Primary key and changed column values for each row.
+        """
+        if not rows:
+            return
+        with self.transaction() as session:
+            session.execute(update(model), rows)
+
+    def bulk_insert(self, objs):
+        """
+        Insert many ORM objects with a single session and commit.
+
+        Callers ingesting many rows (e.g. FileInstances) should accumulate them and
+        submit them as one batch rather than committing per object.
+
+        Args:
+            objs (list): ORM objects to insert.
+        """
+        with self._session_factory() as session:
+            session.bulk_save_objects(objs, return_defaults=False)
+            session.commit()
+
     def close(self):
-        """Close database connection."""
+        """Close the current thread's session and the database connection."""
+        self.Session.remove()
         self.engine.dispose()
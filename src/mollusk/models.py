@@ -1,10 +1,29 @@
 import datetime
+import uuid
 
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, LargeBinary
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 
 from mollusk.database import Base
-from mollusk.storage import POSIXStorage, S3Storage
+from mollusk.storage import STORAGE_REGISTRY
+
+
+class UUIDBinary(TypeDecorator):
+    """UUID stored as its raw 16 bytes, accepting a uuid.UUID or its string form."""
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(value)
+        return value.bytes
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else uuid.UUID(bytes=value)
 
 
 class Item(Base):
@@ -28,8 +47,8 @@ class File(Base):
 
     __tablename__ = "file"
 
-    file_id = Column(String(36), primary_key=True)
-    item_id = Column(String(255), ForeignKey("item.item_id"))
+    file_id = Column(UUIDBinary, primary_key=True)
+    item_id = Column(String(255), ForeignKey("item.item_id"), index=True)
     filename = Column(String(255))
     mimetype = Column(String(100))
     created_date = Column(TIMESTAMP, default=datetime.datetime.utcnow)
@@ -44,11 +63,12 @@ class FileInstance(Base):
 
     __tablename__ = "file_instance"
 
-    file_instance_id = Column(String(36), primary_key=True)
-    file_id = Column(String(36), ForeignKey("file.file_id"))
+    file_instance_id = Column(UUIDBinary, primary_key=True)
+    file_id = Column(UUIDBinary, ForeignKey("file.file_id"), index=True)
     storage_class = Column(String(50))  # Storage type (posix, s3, etc.)
     uri = Column(String(1024))
-    checksum = Column(String(1024))
+    checksum = Column(String(144))  # "<algorithm>:<hexdigest>", up to "sha3_512:" + 128
+    etag = Column(String(255))  # storage content identifier the checksum was taken at
     size = Column(Integer)
     created_date = Column(TIMESTAMP, default=datetime.datetime.utcnow)
 
@@ -60,11 +80,46 @@ class FileInstance(Base):
     @property
     def storage(self):
         if not self._storage:
-            if self.storage_class == "POSIXStorage":
-                storage = POSIXStorage(self.uri)
-            elif self.storage_class == "S3Storage":
-                storage = S3Storage(self.uri)
-            else:
-                raise ValueError(f"Storage class not recognized: {self.storage_class}")
-            self._storage = storage
+            try:
+                storage_class = STORAGE_REGISTRY[self.storage_class]
+            except KeyError:
+                error_msg = f"Storage class not recognized: {self.storage_class}"
+                raise ValueError(error_msg) from None
+            self._storage = storage_class(self.uri)
         return self._storage
+
+    def compute_checksum(self, algorithm="SHA256"):
+        """Calculate the checksum from storage and record it as '<algorithm>:<digest>'."""
+        digest = self.storage.calculate_checksum(algorithm=algorithm)
+        return self.record_checksum(algorithm, digest)
+
+    def record_checksum(self, algorithm, digest):
+        """Record an already calculated checksum as '<algorithm>:<digest>'."""
+        self.checksum = f"{algorithm.lower()}:{digest}"
+        self.etag = self.storage.etag()
+        return self.checksum
+
+    def verified_checksum(self):
+        """Return the stored checksum, recalculating it only if storage has changed.
+
+        The stored checksum is trusted while the storage's cheap metadata is unchanged:
+        the ETag recorded with the checksum (the object ETag for S3, size and mtime for
+        POSIX) still matches a freshly read one, or, for rows recorded without an ETag,
+        the file has not been modified since this instance was created.  Otherwise the
+        checksum is recalculated with the same algorithm and set on the row, along with
+        the new ETag; the caller is responsible for committing.
+        """
+        if self.checksum and not self._storage_changed():
+            return self.checksum
+        algorithm, _, _ = (self.checksum or "").rpartition(":")
+        return self.compute_checksum(algorithm or "SHA256")
+
+    def _storage_changed(self):
+        if self.etag is not None:
+            return self.storage.etag(refresh=True) != self.etag
+        modified_date = self.storage.modified_date()
+        return (
+            modified_date is None
+            or self.created_date is None
+            or modified_date > self.created_date
+        )
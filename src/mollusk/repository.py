@@ -1,10 +1,85 @@
 import mimetypes
+import multiprocessing
 import os
+import threading
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+
+from sqlalchemy import bindparam, delete, select
+from sqlalchemy.orm import joinedload, selectinload
 
 from mollusk.database import Database
 from mollusk.models import File, FileInstance, Item
 
+if not mimetypes.inited:
+    # init() rebuilds the database, discarding types the application already added
+    mimetypes.init()
+# fast path for plain extensions; encoding and suffix aliases (".gz", ".tgz") are left
+# out so compound names like "a.tar.gz" still go through mimetypes.guess_type, as do
+# types registered with mimetypes.add_type() after import
+_MIMETYPES_BY_EXTENSION = {
+    extension.lower(): mimetype
+    for extension, mimetype in mimetypes.types_map.items()
+    if extension not in mimetypes.encodings_map and extension not in mimetypes.suffix_map
+}
+
+# paginated listing statements, built once so the ORM can reuse their compiled form
+_FILES = select(File).offset(bindparam("skip")).limit(bindparam("limit"))
+_FILES_BY_ITEM = _FILES.where(File.item_id == bindparam("item_id"))
+_FILE_INSTANCES = select(FileInstance).offset(bindparam("skip")).limit(bindparam("limit"))
+_FILE_INSTANCES_BY_FILE = _FILE_INSTANCES.where(
+    FileInstance.file_id == bindparam("file_id")
+)
+
+# ids may be given as strings, which the default in-Python evaluation of a DELETE's
+# WHERE clause would not match against loaded UUIDs, so deleted rows are fetched
+_SYNCHRONIZE_BY_FETCH = {"synchronize_session": "fetch"}
+
+
+def _parse_uuid(value):
+    """Return a file or file instance id as a UUID, or None if it is not one."""
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(value)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _prefixed_checksum(checksum, algorithm):
+    """Return a given checksum as '<algorithm>:<digest>', prefixing a bare digest."""
+    if checksum and ":" not in checksum:
+        return f"{algorithm.lower()}:{checksum}"
+    return checksum
+
+
+def _calculate_checksum(storage_class, uri, algorithm):
+    """Calculate a file instance's (checksum, etag) columns, in a worker process."""
+    file_instance = FileInstance(storage_class=storage_class, uri=uri)
+    file_instance.compute_checksum(algorithm)
+    return file_instance.checksum, file_instance.etag
+
+
+def _calculate_checksums(specs, algorithm, max_workers=None):
+    """Calculate (checksum, etag) for each storage_class/uri spec across processes."""
+    # forking a process that already runs threads (log listener, S3 transfers) can
+    # deadlock the child, so workers start from a clean server process where possible
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("forkserver")
+    else:
+        mp_context = None
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        return list(
+            executor.map(
+                _calculate_checksum,
+                [spec["storage_class"] for spec in specs],
+                [spec["uri"] for spec in specs],
+                repeat(algorithm),
+            )
+        )
+
 
 class Repository:
     """
@@ -19,35 +94,61 @@ class Repository:
         self.db = Database(
             db_path or os.path.join(os.path.expanduser("~"), ".mollusk", "mollusk.sqlite")
         )
-        self._session = None
+        # bulk() defers commits of the current thread's session only
+        self._local = threading.local()
+
+    @property
+    def _in_bulk(self):
+        return getattr(self._local, "in_bulk", False)
+
+    @_in_bulk.setter
+    def _in_bulk(self, value):
+        self._local.in_bulk = value
 
     @property
     def session(self):
-        """Get the current session or create a new one if needed."""
-        if self._session is None:
-            self._session = self.db.get_session()
-        return self._session
+        """Get the current thread's session, creating it if needed."""
+        return self.db.get_session()
 
     def commit(self):
-        """Commit the current session."""
-        if self._session:
-            self._session.commit()
+        """Commit the current session, unless deferred by an enclosing bulk() block."""
+        if self.db.Session.registry.has() and not self._in_bulk:
+            self.session.commit()
+
+    @contextmanager
+    def bulk(self):
+        """
+        Defer the commits of repository operations until the block exits.
+
+        Everything written inside the block is committed once on exit, or rolled back
+        if the block raises, instead of committing after every operation.
+        """
+        if self._in_bulk:
+            yield self
+            return
+
+        self._in_bulk = True
+        try:
+            yield self
+        except BaseException:
+            self._in_bulk = False
+            self.rollback()
+            raise
+        self._in_bulk = False
+        self.commit()
 
     def flush(self):
         """Flush the current session."""
-        if self._session:
-            self._session.flush()
+        if self.db.Session.registry.has():
+            self.session.flush()
 
     def rollback(self):
         """Rollback the current session."""
-        if self._session:
-            self._session.rollback()
+        if self.db.Session.registry.has():
+            self.session.rollback()
 
     def close(self):
-        """Close the current session and the database connection."""
-        if self._session:
-            self._session.close()
-            self._session = None
+        """Close the current thread's session and the database connection."""
         self.db.close()
 
     # ------------------------------------------------------------------------------
@@ -61,19 +162,39 @@ class Repository:
         if files:
             for file in files:
                 file.item_id = item.item_id
-                self.session.add(file)
+            self.session.add_all(files)
 
         self.commit()
         return item
 
     def get_item(self, item_id):
         """Get an item by its ID."""
-        return self.session.query(Item).filter(Item.item_id == item_id).first()
+        return self.session.get(Item, item_id)
 
     def get_items(self, skip=0, limit=100):
         """Get a paginated list of items."""
         return self.session.query(Item).offset(skip).limit(limit).all()
 
+    def get_item_metadata(self, skip=0, limit=100):
+        """
+        Get a paginated list of (item_id, title) rows for listing items.
+
+        Only the two columns are selected and no Item objects are built; use get_items
+        when full items are needed.
+        """
+        statement = select(Item.item_id, Item.title).offset(skip).limit(limit)
+        return self.session.execute(statement).all()
+
+    def get_items_with_files(self, skip=0, limit=100):
+        """Get a paginated list of items, with their files and instances preloaded."""
+        return (
+            self.session.query(Item)
+            .options(selectinload(Item.files).selectinload(File.instances))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
     def update_item(self, item_id, **kwargs):
         """Update an item with the given attributes."""
         item = self.get_item(item_id)
@@ -88,13 +209,21 @@ class Repository:
 
     def delete_item(self, item_id):
         """Delete an item and all its files."""
-        item = self.get_item(item_id)
-        if not item:
-            return False
-
-        self.session.delete(item)
+        file_ids = select(File.file_id).where(File.item_id == item_id)
+        self.session.execute(
+            delete(FileInstance).where(FileInstance.file_id.in_(file_ids)),
+            execution_options=_SYNCHRONIZE_BY_FETCH,
+        )
+        self.session.execute(
+            delete(File).where(File.item_id == item_id),
+            execution_options=_SYNCHRONIZE_BY_FETCH,
+        )
+        result = self.session.execute(
+            delete(Item).where(Item.item_id == item_id),
+            execution_options=_SYNCHRONIZE_BY_FETCH,
+        )
         self.commit()
-        return True
+        return result.rowcount > 0
 
     # ------------------------------------------------------------------------------
     # File operations
@@ -107,13 +236,16 @@ class Repository:
         instances: list[FileInstance] | None = None,
     ):
         """Create a new file associated with an item."""
-        file_id = str(uuid.uuid4())
+        file_id = uuid.uuid4()
         default_mimetype = "application/octet-stream"
         file = File(
             file_id=file_id,
             item_id=item_id,
             filename=filename,
-            mimetype=mimetype or mimetypes.guess_type(filename)[0] or default_mimetype,
+            mimetype=mimetype
+            or _MIMETYPES_BY_EXTENSION.get(os.path.splitext(filename)[1].lower())
+            or mimetypes.guess_type(filename)[0]
+            or default_mimetype,
         )
         self.session.add(file)
 
@@ -127,14 +259,28 @@ class Repository:
 
     def get_file(self, file_id):
         """Get a file by its ID."""
-        return self.session.query(File).filter(File.file_id == file_id).first()
+        file_id = _parse_uuid(file_id)
+        if file_id is None:
+            return None
+        return self.session.get(File, file_id)
 
     def get_files(self, item_id=None, skip=0, limit=100):
         """Get a paginated list of files, optionally filtered by item_id."""
-        query = self.session.query(File)
+        params = {"skip": skip, "limit": limit}
         if item_id:
-            query = query.filter(File.item_id == item_id)
-        return query.offset(skip).limit(limit).all()
+            statement, params["item_id"] = _FILES_BY_ITEM, item_id
+        else:
+            statement = _FILES
+        return self.session.execute(statement, params).scalars().all()
+
+    def get_files_with_instances(self, item_id):
+        """Get all files for an item, with their instances loaded in one JOIN query."""
+        return (
+            self.session.query(File)
+            .options(joinedload(File.instances))
+            .filter(File.item_id == item_id)
+            .all()
+        )
 
     def update_file(self, file_id, **kwargs):
         """Update a file with the given attributes."""
@@ -150,13 +296,19 @@ class Repository:
 
     def delete_file(self, file_id):
         """Delete a file and all its instances."""
-        file = self.get_file(file_id)
-        if not file:
+        file_id = _parse_uuid(file_id)
+        if file_id is None:
             return False
-
-        self.session.delete(file)
+        self.session.execute(
+            delete(FileInstance).where(FileInstance.file_id == file_id),
+            execution_options=_SYNCHRONIZE_BY_FETCH,
+        )
+        result = self.session.execute(
+            delete(File).where(File.file_id == file_id),
+            execution_options=_SYNCHRONIZE_BY_FETCH,
+        )
         self.commit()
-        return True
+        return result.rowcount > 0
 
     # ------------------------------------------------------------------------------
     # FileInstance operations
@@ -168,39 +320,113 @@ class Repository:
         uri,
         checksum=None,
         size=None,
+        checksum_algorithm="SHA256",
     ):
-        """Create a new file instance associated with a file."""
-        file_instance_id = str(uuid.uuid4())
+        """
+        Create a new file instance associated with a file.
+
+        Checksums are stored as '<algorithm>:<hexdigest>', e.g. 'sha256:9f86...'.  A
+        given checksum without a prefix is taken to be a `checksum_algorithm` digest and
+        prefixed; if none is given, it is calculated from storage.
+        """
+        file_instance_id = uuid.uuid4()
         file_instance = FileInstance(
             file_instance_id=file_instance_id,
             file_id=file_id,
             storage_class=storage_class,
             uri=uri,
-            checksum=checksum,
+            checksum=_prefixed_checksum(checksum, checksum_algorithm),
             size=size,
         )
 
         if not checksum:
-            file_instance.checksum = file_instance.storage.calculate_checksum()
+            file_instance.compute_checksum(checksum_algorithm)
 
         self.session.add(file_instance)
         self.commit()
         return file_instance
 
+    def create_file_instances(self, specs, checksum_algorithm="SHA256", max_workers=None):
+        """
+        Create many file instances, calculating missing checksums in parallel.
+
+        Each spec is a dict of FileInstance columns (file_id, storage_class, uri, and
+        optionally checksum and size).  Given checksums are prefixed as in
+        create_file_instance; those not given are calculated across a process pool,
+        then all instances are added with a single commit.
+        """
+        file_instances = [
+            FileInstance(
+                file_instance_id=uuid.uuid4(),
+                **{
+                    **spec,
+                    "checksum": _prefixed_checksum(
+                        spec.get("checksum"), checksum_algorithm
+                    ),
+                },
+            )
+            for spec in specs
+        ]
+        pending = [
+            (instance, spec)
+            for instance, spec in zip(file_instances, specs, strict=True)
+            if not instance.checksum
+        ]
+        if pending:
+            results = _calculate_checksums(
+                [spec for _, spec in pending], checksum_algorithm, max_workers
+            )
+            for (instance, _), (checksum, etag) in zip(pending, results, strict=True):
+                instance.checksum, instance.etag = checksum, etag
+
+        self.session.add_all(file_instances)
+        self.commit()
+        return file_instances
+
+    def create_file_instances_bulk(
+        self, rows, checksum_algorithm="SHA256", max_workers=None
+    ):
+        """
+        Insert many file instances from dicts of columns, without building ORM objects.
+
+        Like create_file_instances, missing checksums are calculated across a process
+        pool, but the rows are written with one executemany via bulk_insert_mappings.
+        The given dicts are completed in place with file_instance_id, checksum and etag
+        and returned; no FileInstance objects are loaded into the session.
+        """
+        pending = []
+        for row in rows:
+            row.setdefault("file_instance_id", uuid.uuid4())
+            if row.get("checksum"):
+                row["checksum"] = _prefixed_checksum(row["checksum"], checksum_algorithm)
+            else:
+                pending.append(row)
+        if pending:
+            results = _calculate_checksums(pending, checksum_algorithm, max_workers)
+            for row, (checksum, etag) in zip(pending, results, strict=True):
+                row["checksum"], row["etag"] = checksum, etag
+
+        self.session.bulk_insert_mappings(FileInstance, rows)
+        self.commit()
+        return rows
+
     def get_file_instance(self, file_instance_id):
         """Get a file instance by its ID."""
-        return (
-            self.session.query(FileInstance)
-            .filter(FileInstance.file_instance_id == file_instance_id)
-            .first()
-        )
+        file_instance_id = _parse_uuid(file_instance_id)
+        if file_instance_id is None:
+            return None
+        return self.session.get(FileInstance, file_instance_id)
 
     def get_file_instances(self, file_id=None, skip=0, limit=100):
         """Get a paginated list of file instances, optionally filtered by file_id."""
-        query = self.session.query(FileInstance)
+        params = {"skip": skip, "limit": limit}
         if file_id:
-            query = query.filter(FileInstance.file_id == file_id)
-        return query.offset(skip).limit(limit).all()
+            if (file_id := _parse_uuid(file_id)) is None:
+                return []
+            statement, params["file_id"] = _FILE_INSTANCES_BY_FILE, file_id
+        else:
+            statement = _FILE_INSTANCES
+        return self.session.execute(statement, params).scalars().all()
 
     def update_file_instance(self, file_instance_id, **kwargs):
         """Update a file instance with the given attributes."""
@@ -216,10 +442,12 @@ class Repository:
 
     def delete_file_instance(self, file_instance_id):
         """Delete a file instance."""
-        file_instance = self.get_file_instance(file_instance_id)
-        if not file_instance:
+        file_instance_id = _parse_uuid(file_instance_id)
+        if file_instance_id is None:
             return False
-
-        self.session.delete(file_instance)
+        result = self.session.execute(
+            delete(FileInstance).where(FileInstance.file_instance_id == file_instance_id),
+            execution_options=_SYNCHRONIZE_BY_FETCH,
+        )
         self.commit()
-        return True
+        return result.rowcount > 0
@@ -13,3 +13,11 @@ REPOSITORY_NAME = "A Mollusk Repository"
 # Logging
 # -------------------------------------------------------------------
 LOG_LEVEL = os.getenv("MOLLUSK_LOG_LEVEL", "INFO")
+
+
+# -------------------------------------------------------------------
+# Database
+# -------------------------------------------------------------------
+DB_POOL_SIZE = int(os.getenv("MOLLUSK_DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("MOLLUSK_DB_POOL_MAX_OVERFLOW", "10"))
+DB_POOL_USE_LIFO = os.getenv("MOLLUSK_DB_POOL_USE_LIFO", "true").lower() == "true"
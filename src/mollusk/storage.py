@@ -1,18 +1,144 @@
 from abc import ABC, abstractmethod
 import base64
-import binascii
+import datetime
+import functools
 import hashlib
+import io
+import mmap
 import os
-from typing import Literal
-from urllib.parse import urlparse
+import shutil
+import sys
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, BinaryIO, Literal
 
-import boto3
-from botocore.exceptions import ClientError
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+if TYPE_CHECKING:
+    from boto3.s3.transfer import TransferConfig
+    from botocore.client import BaseClient
+
+MMAP_THRESHOLD = 1 << 20  # files at least this large are memory-mapped for hashing
+MMAP_SLICE_SIZE = 4 << 20  # bytes handed to the hash function per update
+
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024  # objects at least this large use multipart
+S3_CHECKSUM_PARAMS = frozenset(("ChecksumSHA1", "ChecksumSHA256"))
+S3_COPY_OBJECT_MAX_SIZE = 5 * 1024**3  # largest object copy_object accepts
+
+CHECKSUM_CACHE_SIZE = 4096  # calculated checksums remembered per process
+
+# boto3 is imported on first S3 use, so POSIX-only callers skip its import cost
+_S3_CLIENTS: dict[tuple[str | None, str | None], "BaseClient"] = {}
+_S3_CLIENTS_LOCK = threading.Lock()
+
+
+def _s3_client(
+    region_name: str | None = None,
+    endpoint_url: str | None = None,
+) -> "BaseClient":
+    """Return a process-wide S3 client for a region and endpoint.
+
+    Building a client re-resolves credentials and configuration, so one is shared by
+    all S3Storage instances with the same region and endpoint.  Clients are
+    thread-safe once built; the lookup is repeated under a lock before building, so
+    threads that miss together still build only one client per key.
+    """
+    key = (region_name, endpoint_url)
+    if (client := _S3_CLIENTS.get(key)) is not None:
+        return client
+    with _S3_CLIENTS_LOCK:
+        if (client := _S3_CLIENTS.get(key)) is None:
+            client = _S3_CLIENTS[key] = _new_s3_client(region_name, endpoint_url)
+        return client
+
+
+def _new_s3_client(region_name: str | None, endpoint_url: str | None) -> "BaseClient":
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        max_pool_connections=50,
+        retries={"mode": "adaptive", "max_attempts": 5},
+        tcp_keepalive=True,
+    )
+    return boto3.session.Session().client(
+        "s3",
+        region_name=region_name,
+        endpoint_url=endpoint_url,
+        config=config,
+    )
+
+
+@functools.cache
+def _s3_transfer_config() -> "TransferConfig":
+    """Return the TransferConfig shared by multipart uploads and downloads."""
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=S3_MULTIPART_THRESHOLD,
+        max_concurrency=10,
+        use_threads=True,
+    )
+
+
+def _new_hasher(algorithm: str):  # noqa: ANN202
+    """Return a new hash object for an algorithm name, e.g. "SHA256" or "BLAKE3"."""
+    if algorithm.upper() == "BLAKE3":
+        if blake3 is None:
+            error_msg = "BLAKE3 checksums require the 'blake3' package."
+            raise ValueError(error_msg)
+        return blake3(max_threads=blake3.AUTO)
+    return hashlib.new(algorithm.lower())
+
+
+# calculated checksums, keyed by location, algorithm and a version of the content
+# (size and mtime for files, ETag for S3 objects), so unchanged content isn't re-hashed
+_CHECKSUM_CACHE: OrderedDict[tuple, str] = OrderedDict()
+_CHECKSUM_CACHE_LOCK = threading.Lock()
+
+
+def _get_cached_checksum(key: tuple) -> str | None:
+    with _CHECKSUM_CACHE_LOCK:
+        checksum = _CHECKSUM_CACHE.get(key)
+        if checksum is not None:
+            _CHECKSUM_CACHE.move_to_end(key)
+        return checksum
+
+
+def _set_cached_checksum(key: tuple, checksum: str) -> None:
+    with _CHECKSUM_CACHE_LOCK:
+        _CHECKSUM_CACHE[key] = checksum
+        _CHECKSUM_CACHE.move_to_end(key)
+        if len(_CHECKSUM_CACHE) > CHECKSUM_CACHE_SIZE:
+            _CHECKSUM_CACHE.popitem(last=False)
+
+
+def _decode_b64_hex(base64_checksum: str) -> str:
+    """Convert a base64 checksum, as returned by S3, to hexdigest format."""
+    return base64.b64decode(base64_checksum).hex()
+
+
+STORAGE_REGISTRY: dict[str, type["Storage"]] = {}
 
 
 class Storage(ABC):
     name = ...
 
+    def __init_subclass__(cls, **kwargs) -> None:  # noqa: ANN003
+        """Register storage subclasses by class name and short name, e.g. "s3"."""
+        super().__init_subclass__(**kwargs)
+        STORAGE_REGISTRY[cls.__name__] = cls
+        # an inherited name stays with the parent, e.g. a POSIXStorage subclass must not
+        # take over "posix"
+        if isinstance(cls.__dict__.get("name"), str):
+            STORAGE_REGISTRY[cls.name] = cls
+
     def __init__(self, uri: str):
         self.uri = uri
 
@@ -40,23 +166,78 @@ class Storage(ABC):
     def get_checksum(self, algorithm: str = "SHA256") -> str:
         pass
 
+    def etag(self, *, refresh: bool = False) -> str | None:  # noqa: ARG002
+        """Return a cheap content identifier from the backend, if it provides one.
+
+        Backends that cache metadata re-read it when `refresh` is True.
+        """
+        return None
+
+    def modified_date(self) -> datetime.datetime | None:
+        """Return the naive UTC last-modified time, if the backend provides one."""
+        return None
+
 
 class POSIXStorage(Storage):
     name = "posix"
 
     def __init__(self, uri: str):
         super().__init__(uri)
-        self.uri = uri
         self.filepath = uri.removeprefix("file://")
 
     def exists(self) -> bool:
         return os.path.exists(self.filepath)
 
-    def write(self, data: str | bytes) -> bool:
-        with open(self.filepath, "wb") as f:
-            f.write(data)
+    def write(self, data: str | bytes, compute_checksum: str | None = "SHA256") -> bool:
+        """Write data to the file.
+
+        When `compute_checksum` names an algorithm, the in-memory data is hashed and
+        cached against the written file's size and mtime, so a following checksum of the
+        unchanged file does not re-read it.
+        """
+        self._write(data, os.O_TRUNC, compute_checksum)
+        return True
+
+    def write_if_absent(
+        self,
+        data: str | bytes,
+        compute_checksum: str | None = "SHA256",
+    ) -> bool:
+        """Write data only if the file does not exist, without a separate exists() check.
+
+        Returns False, without writing, if the file already exists.
+        """
+        try:
+            self._write(data, os.O_EXCL, compute_checksum)
+        except FileExistsError:
+            return False
         return True
 
+    def _write(self, data: str | bytes, flags: int, compute_checksum: str | None) -> None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        # an unsupported algorithm must fail before the file is truncated
+        hash_func = _new_hasher(compute_checksum) if compute_checksum else None
+        # write straight to the descriptor, skipping a copy into a BufferedWriter
+        fd = os.open(self.filepath, os.O_WRONLY | os.O_CREAT | flags, 0o666)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+            os.fsync(fd)
+            stat = os.fstat(fd)
+            if len(data) >= 1 << 20 and hasattr(os, "posix_fadvise"):
+                # written once and already hashed, so keep it from crowding the cache
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+        if hash_func is not None:
+            hash_func.update(data)
+            _set_cached_checksum(
+                (self.filepath, stat.st_size, stat.st_mtime_ns, compute_checksum.upper()),
+                hash_func.hexdigest(),
+            )
+
     def read(self) -> str | bytes:
         with open(self.filepath, "rb") as f:
             return f.read()
@@ -66,72 +247,369 @@ class POSIXStorage(Storage):
             os.remove(self.filepath)
         return True
 
+    def copy_to(self, destination: "POSIXStorage") -> bool:
+        """Copy the file to another POSIX location, keeping the bytes in the kernel.
+
+        Tries copy_file_range (which may also reflink on supporting filesystems), then
+        sendfile, and finally falls back to shutil.copyfileobj.  Raises
+        shutil.SameFileError if the destination is this file, which opening it for
+        writing would otherwise truncate.
+        """
+        if os.path.exists(destination.filepath) and os.path.samefile(
+            self.filepath, destination.filepath
+        ):
+            error_msg = f"{self.uri} and {destination.uri} are the same file."
+            raise shutil.SameFileError(error_msg)
+        with open(self.filepath, "rb") as src, open(destination.filepath, "wb") as dst:
+            src_fd, dst_fd = src.fileno(), dst.fileno()
+            remaining = os.fstat(src_fd).st_size
+            try:
+                while remaining > 0 and (
+                    copied := os.copy_file_range(src_fd, dst_fd, remaining)
+                ):
+                    remaining -= copied
+            except (AttributeError, OSError):
+                try:
+                    while remaining > 0 and (
+                        copied := os.sendfile(dst_fd, src_fd, None, remaining)
+                    ):
+                        remaining -= copied
+                except OSError:
+                    shutil.copyfileobj(src, dst)
+            dst.flush()
+            os.fsync(dst_fd)
+        return True
+
+    def etag(self, *, refresh: bool = False) -> str:  # noqa: ARG002
+        """Return "<size>-<mtime_ns>", which changes whenever the file is rewritten."""
+        stat = os.stat(self.filepath)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def modified_date(self) -> datetime.datetime:
+        mtime = os.stat(self.filepath).st_mtime
+        return datetime.datetime.fromtimestamp(mtime, datetime.UTC).replace(tzinfo=None)
+
     def calculate_checksum(self, algorithm: str = "SHA256") -> str:
-        """Calculate checksum by reading file in chunks."""
-        hash_func = hashlib.new(algorithm)
-        chunk_size = 65536  # 64KB per chunk
+        """Calculate checksum of the file."""
+        return self.calculate_checksums((algorithm,))[algorithm]
+
+    def calculate_checksums(
+        self,
+        algorithms: tuple[str, ...] = ("SHA256",),
+    ) -> dict[str, str]:
+        """Calculate checksums for several algorithms in a single pass over the file.
+
+        Small files are read in a single call.  Larger files are memory-mapped and fed
+        to each hash function as memoryview slices, avoiding a copy of every chunk into
+        a Python bytes object; if mmap is unsupported, they are read in chunks sized
+        from the filesystem block size.
+
+        BLAKE3 is supported when the optional `blake3` package is installed; it hashes
+        each slice across multiple threads.
+
+        Checksums are remembered per path, size and modification time, so calculating
+        them again for an unchanged file does not re-read it.
+
+        Returns a dict of algorithm to hexdigest.
+        """
         with open(self.filepath, "rb") as f:
-            while chunk := f.read(chunk_size):
-                hash_func.update(chunk)
-        return hash_func.hexdigest()
+            stat = os.fstat(f.fileno())
+            version = (self.filepath, stat.st_size, stat.st_mtime_ns)
+            checksums = {
+                algorithm: _get_cached_checksum((*version, algorithm.upper()))
+                for algorithm in algorithms
+            }
+            hash_funcs = {
+                algorithm: _new_hasher(algorithm)
+                for algorithm, checksum in checksums.items()
+                if checksum is None
+            }
+            if not hash_funcs:
+                return checksums
+            if stat.st_size < MMAP_THRESHOLD:
+                data = f.read()
+                for hash_func in hash_funcs.values():
+                    hash_func.update(data)
+            else:
+                self._hash_large_file(f, stat.st_size, hash_funcs.values())
+        for algorithm, hash_func in hash_funcs.items():
+            checksums[algorithm] = hash_func.hexdigest()
+            _set_cached_checksum((*version, algorithm.upper()), checksums[algorithm])
+        return checksums
+
+    @staticmethod
+    def _hash_large_file(f: BinaryIO, size: int, hash_funcs: Iterable) -> None:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            # filesystem does not support mmap, read in block-size multiples
+            buffer = bytearray(max(1 << 20, os.fstat(f.fileno()).st_blksize * 16))
+            with memoryview(buffer) as view:
+                while read_size := f.readinto(buffer):
+                    for hash_func in hash_funcs:
+                        hash_func.update(view[:read_size])
+            return
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        with mm, memoryview(mm) as view:
+            for offset in range(0, size, MMAP_SLICE_SIZE):
+                # each slice is hashed by every algorithm while it is still in cache
+                chunk = view[offset : offset + MMAP_SLICE_SIZE]
+                for hash_func in hash_funcs:
+                    hash_func.update(chunk)
+                chunk.release()
 
     def get_checksum(self, algorithm: str = "SHA256") -> str:
+        """Return the checksum of the file, cached if it is unchanged since calculated.
+
+        Checksums computed by write() are cached the same way, so the file is only read
+        if it has changed since.
+        """
         return self.calculate_checksum(algorithm=algorithm)
 
 
 class S3Storage(Storage):
     name = "s3"
 
-    def __init__(self, uri: str):
+    def __init__(
+        self,
+        uri: str,
+        region_name: str | None = None,
+        endpoint_url: str | None = None,
+    ):
         super().__init__(uri)
-        self.uri = uri
-        parsed = urlparse(uri)
-        if parsed.scheme != "s3":
+        if not uri.startswith("s3://"):
             raise ValueError("URI must start with s3://")
-        self.bucket = parsed.netloc
-        self.key = parsed.path.lstrip("/")
-        self.s3 = boto3.client("s3")
+        location = uri.removeprefix("s3://")
+        bucket, _, key = location.partition("/")
+        # many instances share a bucket; interning makes later lookups pointer compares
+        self.bucket = sys.intern(bucket)
+        self.key = key.lstrip("/")
+        self.s3 = _s3_client(region_name, endpoint_url)
+        self._head_response = None
+        self._written_etag = None
 
     def exists(self) -> bool:
         try:
             self.s3.head_object(Bucket=self.bucket, Key=self.key)
             return True
-        except ClientError as e:
+        except self.s3.exceptions.ClientError as e:
             if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
                 return False
             raise
 
+    @staticmethod
+    def exists_many(storages: list["S3Storage"], concurrency: int = 32) -> list[bool]:
+        """Check whether many objects exist with concurrent HEAD requests.
+
+        Results are returned in the same order as `storages`.
+        """
+        if not storages:
+            return []
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(storages))) as executor:
+            return list(executor.map(S3Storage.exists, storages))
+
     def write(
         self,
         data: str | bytes,
         algorithm: Literal["MD5", "SHA256"] = "SHA256",
     ) -> bool:
+        """Write data to the object.
+
+        Data below the multipart threshold is sent as a single PUT, along with its
+        checksum for S3 to validate; anything larger is uploaded as concurrent
+        multipart parts.  The checksum is computed from the in-memory data and, once
+        the upload succeeds, cached against the new object's ETag, so a following
+        get_checksum() of that version needs no request.
+        """
         if isinstance(data, str):
             data = data.encode("utf-8")
-        params = {
-            "Bucket": self.bucket,
-            "Key": self.key,
-            "Body": data,
-            "ChecksumAlgorithm": algorithm,
-        }
-        self.s3.put_object(**params)
+        digest = self._digest(data, algorithm)
+        if len(data) < S3_MULTIPART_THRESHOLD:
+            self._put_object(data, algorithm, digest)
+        else:
+            self._written_etag = None
+            self.s3.upload_fileobj(
+                io.BytesIO(data),
+                self.bucket,
+                self.key,
+                ExtraArgs={"ChecksumAlgorithm": algorithm},
+                Config=_s3_transfer_config(),
+            )
+            # upload_fileobj does not return the new ETag
+            self.etag(refresh=True)
+        self._cache_written_checksum(algorithm, digest)
         return True
 
+    def write_if_absent(
+        self,
+        data: str | bytes,
+        algorithm: Literal["MD5", "SHA256"] = "SHA256",
+    ) -> bool:
+        """Write data only if no object exists at the key, with one conditional PUT.
+
+        This replaces an exists() HEAD followed by a PUT.  Returns False, without
+        writing, if the object already exists.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = self._digest(data, algorithm)
+        try:
+            self._put_object(data, algorithm, digest, IfNoneMatch="*")
+        except self.s3.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] == "PreconditionFailed":
+                return False
+            raise
+        self._cache_written_checksum(algorithm, digest)
+        return True
+
+    def _put_object(
+        self,
+        data: bytes,
+        algorithm: str,
+        digest: bytes,
+        **params: str,
+    ) -> None:
+        checksum_key = f"Checksum{algorithm.upper()}"
+        if checksum_key in S3_CHECKSUM_PARAMS:
+            params[checksum_key] = base64.b64encode(digest).decode("ascii")
+        self._head_response = self._written_etag = None
+        response = self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Body=data,
+            ChecksumAlgorithm=algorithm,
+            **params,
+        )
+        if "ETag" in response:
+            self._written_etag = response["ETag"].strip('"')
+
+    def _cache_written_checksum(self, algorithm: str, digest: bytes) -> None:
+        if self._written_etag is not None or self._head_response is not None:
+            _set_cached_checksum((self.uri, self.etag(), algorithm.upper()), digest.hex())
+
+    @staticmethod
+    def _digest(data: bytes, algorithm: str) -> bytes:
+        hash_func = _new_hasher(algorithm)
+        hash_func.update(data)
+        return hash_func.digest()
+
     def read(self) -> bytes:
-        response = self.s3.get_object(Bucket=self.bucket, Key=self.key)
+        """Read the object, fetching large objects as concurrent byte ranges.
+
+        download_fileobj issues its own HEAD to size the object, so when a cached HEAD
+        already shows a small object it is fetched with a single GET instead.
+        """
+        head = self._head_response
+        if head is not None and head["ContentLength"] < S3_MULTIPART_THRESHOLD:
+            return self.s3.get_object(Bucket=self.bucket, Key=self.key)["Body"].read()
+        buffer = io.BytesIO()
+        self.s3.download_fileobj(
+            self.bucket,
+            self.key,
+            buffer,
+            Config=_s3_transfer_config(),
+        )
+        return buffer.getvalue()
+
+    def stream(
+        self,
+        chunk_size: int = S3_MULTIPART_THRESHOLD,
+        concurrency: int = 10,
+    ) -> Iterator[bytes]:
+        """Yield the object as byte-range chunks, without holding it all in memory.
+
+        Up to `concurrency` ranges are fetched ahead in parallel; chunks are always
+        yielded in order.
+        """
+        size = self._head()["ContentLength"]
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            pending = deque()
+            for start in range(0, size, chunk_size):
+                end = min(start + chunk_size, size) - 1
+                pending.append(executor.submit(self._get_range, start, end))
+                if len(pending) >= concurrency:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _get_range(self, start: int, end: int) -> bytes:
+        response = self.s3.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f"bytes={start}-{end}",
+        )
         return response["Body"].read()
 
     def delete(self) -> bool:
         self.s3.delete_object(Bucket=self.bucket, Key=self.key)
+        self._head_response = self._written_etag = None
         return True
 
-    def calculate_checksum(self, algorithm: Literal["MD5", "SHA256"] = "SHA256") -> str:
+    def _head(self) -> dict:
+        """Return the object's HEAD response, including checksums, cached per instance.
+
+        The cache is cleared whenever this instance modifies the object.
+        """
+        if self._head_response is None:
+            self._head_response = self.s3.head_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                ChecksumMode="ENABLED",
+            )
+            self._written_etag = None
+        return self._head_response
+
+    def etag(self, *, refresh: bool = False) -> str:
+        """Return the object's ETag, re-reading it with a HEAD when `refresh` is True.
+
+        Right after a PUT by this instance, the ETag returned by the PUT is used.
+        """
+        if refresh:
+            self._head_response = self._written_etag = None
+        if self._head_response is None and self._written_etag is not None:
+            return self._written_etag
+        return self._head()["ETag"].strip('"')
+
+    def calculate_checksum(
+        self,
+        algorithm: Literal["MD5", "SHA256"] = "SHA256",
+        *,
+        server_side: bool = True,
+    ) -> str:
         """
         Generate a checksum for the object by copying it over itself.
 
-        This leverages S3's capability to calculate the checksum.
+        This leverages S3's capability to calculate the checksum.  If the object already
+        carries a checksum for the algorithm, it is returned without copying.  When
+        `server_side` is False (e.g. to avoid new versions in versioned buckets), or the
+        object is too large for copy_object, it is hashed locally from parallel ranged
+        GETs instead.  Calculated checksums are remembered per object ETag, so an
+        unchanged object is not copied or downloaded again.
         Returns the checksum in hexdigest format.
         """
+        try:
+            return self.get_checksum(algorithm=algorithm)
+        except ValueError:
+            pass
+
+        cache_key = (self.uri, self.etag(), algorithm.upper())
+        if checksum := _get_cached_checksum(cache_key):
+            return checksum
+        checksum = self._calculate_checksum(algorithm, server_side=server_side)
+        _set_cached_checksum(cache_key, checksum)
+        return checksum
+
+    def _calculate_checksum(self, algorithm: str, *, server_side: bool) -> str:
+        if not server_side or self._head()["ContentLength"] > S3_COPY_OBJECT_MAX_SIZE:
+            return self._streaming_checksum(algorithm)
+
+        self._head_response = None
         response = self.s3.copy_object(
             Bucket=self.bucket,
             Key=self.key,
@@ -140,30 +618,39 @@ class S3Storage(Storage):
         )
         checksum_key = f"Checksum{algorithm.upper()}"
         try:
-            base64_checksum = response["CopyObjectResult"][checksum_key]
-            decoded_bytes = base64.b64decode(base64_checksum)
-            return binascii.hexlify(decoded_bytes).decode("ascii")
+            return _decode_b64_hex(response["CopyObjectResult"][checksum_key])
         except KeyError:
             error_msg = f"Checksum {algorithm} not found in copy response."
             raise ValueError(error_msg)
 
+    def _streaming_checksum(self, algorithm: str) -> str:
+        hash_func = _new_hasher(algorithm)
+        for chunk in self.stream():
+            hash_func.update(chunk)
+        return hash_func.hexdigest()
+
     def get_checksum(self, algorithm: Literal["MD5", "SHA256"] = "SHA256") -> str:
         """Retrieve the checksum from the object's metadata via a HEAD request.
 
+        A checksum cached by write() or calculate_checksum() for the object's current
+        ETag is returned directly.  Composite checksums of multipart uploads are not a
+        digest of the object's content, so they raise ValueError like a missing
+        checksum.
         Returns the checksum in hexdigest format.
         """
-        head_response = self.s3.head_object(
-            Bucket=self.bucket,
-            Key=self.key,
-            ChecksumMode="ENABLED",
-        )
-        checksum_key = f"Checksum{algorithm.upper()}"
-        if checksum_key in head_response:
-            base64_checksum = head_response[checksum_key]
-            # Decode base64 to bytes, then convert to hex string
-            decoded_bytes = base64.b64decode(base64_checksum)
-            return binascii.hexlify(decoded_bytes).decode("ascii")
+        if checksum := _get_cached_checksum((self.uri, self.etag(), algorithm.upper())):
+            return checksum
+        head_response = self._head()
+        checksum = head_response.get(f"Checksum{algorithm.upper()}")
+        # multipart uploads carry a checksum of part checksums, "<base64>-<parts>"
+        if (
+            checksum
+            and "-" not in checksum
+            and head_response.get("ChecksumType") != "COMPOSITE"
+        ):
+            return _decode_b64_hex(checksum)
         error_msg = (
-            f"Object does not have a {algorithm} checksum: s3://{self.bucket}/{self.key}"
+            f"Object does not have a full-object {algorithm} checksum: "
+            f"s3://{self.bucket}/{self.key}"
         )
         raise ValueError(error_msg)
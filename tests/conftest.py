@@ -18,3 +18,13 @@ def temp_directory():
         os.chdir(temp_dir)
         yield Path(temp_dir)
         os.chdir(original_dir)
+
+
+@pytest.fixture
+def repository(tmp_path):
+    from mollusk.repository import Repository
+
+    repo = Repository(db_path=str(tmp_path / "db" / "mollusk.sqlite"))
+    repo.db.create_tables()
+    yield repo
+    repo.close()
@@ -0,0 +1,173 @@
+"""Tests for the Database."""
+
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.pool import QueuePool
+
+from mollusk import settings
+from mollusk.database import Base, Database
+from mollusk.models import Item
+from mollusk.repository import Repository
+
+
+def test_database_uses_wal_journal_mode(tmp_path):
+    """Test that connections are configured for WAL journaling."""
+    database = Database(str(tmp_path / "mollusk.sqlite"))
+    with database.engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+    database.close()
+    assert journal_mode == "wal"
+
+
+def test_bulk_insert(tmp_path):
+    """Test that bulk_insert persists all objects in one batch."""
+    database = Database(str(tmp_path / "mollusk.sqlite"))
+    database.create_tables()
+    database.bulk_insert([Item(item_id=f"item-{i}", title=f"Item {i}") for i in range(5)])
+
+    with database.get_session() as session:
+        assert session.query(Item).count() == 5
+    database.close()
+
+
+def test_insert_many(tmp_path):
+    """Test that insert_many inserts all rows in one transaction."""
+    database = Database(str(tmp_path / "mollusk.sqlite"))
+    database.create_tables()
+    database.insert_many(Item, [{"item_id": f"item-{i}", "title": "x"} for i in range(5)])
+
+    with database.get_session() as session:
+        items = session.query(Item).all()
+        assert len(items) == 5
+        assert all(item.created_date is not None for item in items)
+    database.close()
+
+
+def test_update_many(tmp_path):
+    """Test that update_many updates each row by primary key."""
+    database = Database(str(tmp_path / "mollusk.sqlite"))
+    database.create_tables()
+    database.insert_many(Item, [{"item_id": f"item-{i}", "title": "x"} for i in range(3)])
+    database.update_many(
+        Item, [{"item_id": f"item-{i}", "title": f"Item {i}"} for i in range(2)]
+    )
+
+    with database.get_session() as session:
+        titles = {item.item_id: item.title for item in session.query(Item)}
+    assert titles == {"item-0": "Item 0", "item-1": "Item 1", "item-2": "x"}
+    database.close()
+
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    """Test that writes inside a failed transaction are discarded."""
+    database = Database(str(tmp_path / "mollusk.sqlite"))
+    database.create_tables()
+
+    with pytest.raises(RuntimeError), database.transaction() as session:
+        session.add(Item(item_id="item-1", title="Item 1"))
+        session.flush()
+        raise RuntimeError
+
+    with database.get_session() as session:
+        assert session.query(Item).count() == 0
+    database.close()
+
+
+def test_foreign_key_columns_are_indexed(tmp_path):
+    """Test that tables are created with indexes on their foreign key columns."""
+    database = Database(str(tmp_path / "mollusk.sqlite"))
+    database.create_tables()
+    inspector = inspect(database.engine)
+    assert [i["column_names"] for i in inspector.get_indexes("file")] == [["item_id"]]
+    assert [i["column_names"] for i in inspector.get_indexes("file_instance")] == [
+        ["file_id"]
+    ]
+    database.close()
+
+
+def test_engine_uses_configured_pool(tmp_path):
+    """Test that the engine pools connections per the database settings."""
+    database = Database(str(tmp_path / "mollusk.sqlite"))
+    assert isinstance(database.engine.pool, QueuePool)
+    assert database.engine.pool.size() == settings.DB_POOL_SIZE
+    assert database.engine.pool.status()
+    database.close()
+
+
+def test_in_memory_database_shares_one_connection():
+    """Test that an in-memory database is visible across sessions."""
+    database = Database(":memory:")
+    Base.metadata.create_all(database.engine)
+    with database.transaction() as session:
+        session.add(Item(item_id="item-1", title="Item 1"))
+
+    with database.get_session() as session:
+        assert session.query(Item).count() == 1
+    database.close()
+
+
+def test_create_tables_creates_parent_directories(tmp_path, monkeypatch):
+    """Test that missing parent directories are created, and bare filenames work."""
+    database = Database(str(tmp_path / "nested" / "dir" / "mollusk.sqlite"))
+    database.create_tables()
+    database.close()
+    assert (tmp_path / "nested" / "dir" / "mollusk.sqlite").exists()
+
+    monkeypatch.chdir(tmp_path)
+    database = Database("mollusk.sqlite")
+    database.create_tables()
+    database.close()
+    assert (tmp_path / "mollusk.sqlite").exists()
+
+
+def test_get_session_is_scoped_to_thread(tmp_path):
+    """Test that each thread reuses its own session until the database is closed."""
+    database = Database(str(tmp_path / "mollusk.sqlite"))
+    session = database.get_session()
+    assert database.get_session() is session
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(database.get_session).result() is not session
+
+    database.close()
+    assert database.get_session() is not session
+    database.close()
+
+
+def test_create_tables_upgrades_existing_database(tmp_path):
+    """Test that a database from before binary ids and etags is upgraded in place."""
+    db_path = tmp_path / "mollusk.sqlite"
+    file_id, file_instance_id = uuid.uuid4(), uuid.uuid4()
+    with sqlite3.connect(db_path) as connection:
+        connection.executescript(
+            f"""
+            CREATE TABLE item (item_id VARCHAR(255) PRIMARY KEY, title VARCHAR(255),
+                created_date TIMESTAMP, updated_date TIMESTAMP);
+            CREATE TABLE file (file_id VARCHAR(36) PRIMARY KEY, item_id VARCHAR(255),
+                filename VARCHAR(255), mimetype VARCHAR(100), created_date TIMESTAMP);
+            CREATE TABLE file_instance (file_instance_id VARCHAR(36) PRIMARY KEY,
+                file_id VARCHAR(36), storage_class VARCHAR(50), uri VARCHAR(1024),
+                checksum VARCHAR(1024), size INTEGER, created_date TIMESTAMP);
+            INSERT INTO item (item_id, title) VALUES ('item-1', 'Item 1');
+            INSERT INTO file (file_id, item_id, filename)
+                VALUES ('{file_id}', 'item-1', 'data.txt');
+            INSERT INTO file_instance (file_instance_id, file_id, storage_class, uri)
+                VALUES ('{file_instance_id}', '{file_id}', 'POSIXStorage', 'file:///x');
+            """
+        )
+    connection.close()
+
+    repository = Repository(db_path=str(db_path))
+    repository.db.create_tables()
+    repository.db.create_tables()
+
+    file = repository.get_file(file_id)
+    assert file.filename == "data.txt"
+    [file_instance] = repository.get_file_instances(file_id=file_id)
+    assert file_instance.file_instance_id == file_instance_id
+    assert file_instance.etag is None
+    assert file.instances == [file_instance]
+    repository.close()
@@ -0,0 +1,31 @@
+"""Tests for the mollusk logger."""
+
+import io
+import logging
+
+from mollusk import _LazyQueueHandler
+
+
+def test_queue_handler_starts_listener_on_first_record():
+    """Test that no listener thread runs until a record is logged."""
+    stream = io.StringIO()
+    handler = _LazyQueueHandler(logging.StreamHandler(stream))
+    assert handler.listener is None
+
+    record = logging.makeLogRecord({"msg": "hello mollusk", "levelno": logging.INFO})
+    handler.handle(record)
+    assert handler.listener is not None
+    handler.listener.stop()
+    assert stream.getvalue() == "hello mollusk\n"
+
+
+def test_queue_handler_resets_listener_in_forked_child():
+    """Test that a forked child gets a fresh queue and starts its own listener."""
+    handler = _LazyQueueHandler(logging.StreamHandler(io.StringIO()))
+    handler.handle(logging.makeLogRecord({"msg": "parent", "levelno": logging.INFO}))
+    parent_listener, parent_queue = handler.listener, handler.queue
+
+    handler._reset_in_child()  # noqa: SLF001
+    assert handler.listener is None
+    assert handler.queue is not parent_queue
+    parent_listener.stop()
@@ -0,0 +1,368 @@
+"""Tests for the Repository."""
+
+import hashlib
+import mimetypes
+import os
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import event, inspect, text
+
+from mollusk.storage import POSIXStorage
+
+
+def test_create_file_instance_records_checksum_algorithm(repository, tmp_path):
+    """Test that a calculated checksum is stored with its algorithm prefix."""
+    filepath = tmp_path / "data.txt"
+    filepath.write_bytes(b"hello mollusk")
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+
+    file_instance = repository.create_file_instance(
+        file.file_id, "POSIXStorage", f"file://{filepath}"
+    )
+
+    expected = hashlib.sha256(b"hello mollusk").hexdigest()
+    assert file_instance.checksum == f"sha256:{expected}"
+
+
+def test_create_file_instance_prefixes_given_checksum(repository, tmp_path):
+    """Test that a given bare digest is stored in the same form as a calculated one."""
+    filepath = tmp_path / "data.txt"
+    filepath.write_bytes(b"hello mollusk")
+    storage = POSIXStorage(f"file://{filepath}")
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+
+    given = repository.create_file_instance(
+        file.file_id, "POSIXStorage", storage.uri, checksum=storage.get_checksum()
+    )
+    calculated = repository.create_file_instance(
+        file.file_id, "POSIXStorage", storage.uri
+    )
+    assert given.checksum == calculated.checksum
+    prefixed = repository.create_file_instance(
+        file.file_id, "POSIXStorage", storage.uri, checksum="md5:abc"
+    )
+    assert prefixed.checksum == "md5:abc"
+
+
+def test_verified_checksum_recalculates_only_when_file_changes(repository, tmp_path):
+    """Test that the stored checksum is trusted until the file is modified."""
+    filepath = tmp_path / "data.txt"
+    filepath.write_bytes(b"hello mollusk")
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+    file_instance = repository.create_file_instance(
+        file.file_id, "POSIXStorage", f"file://{filepath}"
+    )
+    stored = file_instance.checksum
+    assert file_instance.verified_checksum() == stored
+
+    filepath.write_bytes(b"goodbye mollusk")
+    future = time.time() + 3600
+    os.utime(filepath, (future, future))
+    expected = hashlib.sha256(b"goodbye mollusk").hexdigest()
+    assert file_instance.verified_checksum() == f"sha256:{expected}"
+
+
+def test_verified_checksum_recalculates_once_per_change(
+    repository, tmp_path, monkeypatch
+):
+    """Test that a recalculated checksum is trusted again until the next change."""
+    filepath = tmp_path / "data.txt"
+    filepath.write_bytes(b"hello mollusk")
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+    file_instance = repository.create_file_instance(
+        file.file_id, "POSIXStorage", f"file://{filepath}"
+    )
+    filepath.write_bytes(b"goodbye mollusk")
+
+    calculations = []
+    calculate_checksum = file_instance.storage.calculate_checksum
+    monkeypatch.setattr(
+        file_instance.storage,
+        "calculate_checksum",
+        lambda **kwargs: calculations.append(1) or calculate_checksum(**kwargs),
+    )
+    expected = hashlib.sha256(b"goodbye mollusk").hexdigest()
+    for _ in range(3):
+        assert file_instance.verified_checksum() == f"sha256:{expected}"
+    assert len(calculations) == 1
+
+
+def test_get_files_with_instances_loads_instances(repository, tmp_path):
+    """Test that files are returned with their instances already loaded."""
+    filepath = tmp_path / "data.txt"
+    filepath.write_bytes(b"hello mollusk")
+    repository.create_item("item-1", "Item 1")
+    for filename in ("a.txt", "b.txt"):
+        file = repository.create_file("item-1", filename)
+        repository.create_file_instance(
+            file.file_id, "POSIXStorage", f"file://{filepath}", checksum="abc"
+        )
+    repository.session.expunge_all()
+
+    files = repository.get_files_with_instances("item-1")
+    assert len(files) == 2
+    assert all("instances" not in inspect(file).unloaded for file in files)
+    assert all(len(file.instances) == 1 for file in files)
+
+
+def test_get_item_metadata_returns_rows(repository):
+    """Test that item metadata is returned as (item_id, title) rows."""
+    for i in range(3):
+        repository.create_item(f"item-{i}", f"Item {i}")
+
+    rows = repository.get_item_metadata(skip=1)
+    assert [tuple(row) for row in rows] == [("item-1", "Item 1"), ("item-2", "Item 2")]
+    assert rows[0].title == "Item 1"
+
+
+def test_get_items_with_files_loads_files_and_instances(repository):
+    """Test that items come back with files and instances in a fixed number of queries."""
+    for i in range(3):
+        repository.create_item(f"item-{i}", f"Item {i}")
+        file = repository.create_file(f"item-{i}", "data.txt")
+        repository.create_file_instance(
+            file.file_id, "POSIXStorage", f"file:///tmp/{i}", checksum="abc"
+        )
+    repository.session.expunge_all()
+
+    statements = []
+    event.listen(
+        repository.db.engine, "before_cursor_execute", lambda *args: statements.append(1)
+    )
+    items = repository.get_items_with_files()
+    assert len(items) == 3
+    assert all(len(file.instances) == 1 for item in items for file in item.files)
+    assert len(statements) == 3
+
+
+def test_bulk_commits_once_on_exit(repository):
+    """Test that operations inside bulk() are committed together on exit."""
+    commits = []
+    event.listen(repository.session, "after_commit", commits.append)
+    with repository.bulk():
+        for i in range(3):
+            repository.create_item(f"item-{i}", f"Item {i}")
+            repository.create_file(f"item-{i}", "data.txt")
+        assert commits == []
+
+    assert len(commits) == 1
+    assert len(repository.get_items()) == 3
+
+
+def test_bulk_defers_only_its_own_threads_commits(repository):
+    """Test that another thread's writes still commit while bulk() is open."""
+    with repository.bulk():
+        repository.create_item("from-bulk-thread", "Bulk")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(repository.create_item, "from-other-thread", "Other").result()
+
+    repository.close()
+    item_ids = {item.item_id for item in repository.get_items()}
+    assert item_ids == {"from-bulk-thread", "from-other-thread"}
+
+
+def test_bulk_rolls_back_on_error(repository):
+    """Test that a failing bulk() block discards its writes."""
+    with pytest.raises(RuntimeError), repository.bulk():
+        repository.create_item("item-1", "Item 1")
+        raise RuntimeError
+
+    assert repository.get_items() == []
+
+
+def test_create_file_guesses_mimetype(repository):
+    """Test that create_file fills in the mimetype from the file extension."""
+    repository.create_item("item-1", "Item 1")
+    assert repository.create_file("item-1", "page.HTML").mimetype == "text/html"
+    assert repository.create_file("item-1", "photo.jpg").mimetype == "image/jpeg"
+    unknown = repository.create_file("item-1", "data.unknownext")
+    assert unknown.mimetype == "application/octet-stream"
+
+
+def test_create_file_falls_back_to_guess_type(repository):
+    """Test that compound suffixes and types added after import are still guessed."""
+    repository.create_item("item-1", "Item 1")
+    assert repository.create_file("item-1", "a.tar.gz").mimetype == "application/x-tar"
+    assert repository.create_file("item-1", "a.tgz").mimetype == "application/x-tar"
+    expected = mimetypes.guess_type("a.gz")[0] or "application/octet-stream"
+    assert repository.create_file("item-1", "a.gz").mimetype == expected
+
+    mimetypes.add_type("application/x-mollusk", ".mollusk")
+    added = repository.create_file("item-1", "a.mollusk")
+    assert added.mimetype == "application/x-mollusk"
+
+
+def test_create_file_instances_calculates_checksums(repository, tmp_path):
+    """Test that missing checksums are calculated for every new instance."""
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+    specs = []
+    for i in range(3):
+        filepath = tmp_path / f"data-{i}.txt"
+        filepath.write_bytes(f"copy {i}".encode())
+        specs.append(
+            {
+                "file_id": file.file_id,
+                "storage_class": "POSIXStorage",
+                "uri": f"file://{filepath}",
+            }
+        )
+    specs.append({**specs[0], "checksum": "sha256:given"})
+
+    file_instances = repository.create_file_instances(specs, max_workers=2)
+
+    checksums = [file_instance.checksum for file_instance in file_instances]
+    expected = [
+        f"sha256:{hashlib.sha256(f'copy {i}'.encode()).hexdigest()}" for i in range(3)
+    ]
+    assert checksums == [*expected, "sha256:given"]
+    assert len(repository.get_file_instances(file_id=file.file_id)) == 4
+
+
+def test_get_files_filters_and_paginates(repository):
+    """Test that get_files and get_file_instances filter by parent and paginate."""
+    repository.create_item("item-1", "Item 1")
+    repository.create_item("item-2", "Item 2")
+    files = [repository.create_file("item-1", f"{i}.txt") for i in range(3)]
+    repository.create_file("item-2", "other.txt")
+    for i in range(2):
+        repository.create_file_instance(
+            files[0].file_id, "POSIXStorage", f"file:///tmp/{i}", checksum="abc"
+        )
+
+    assert len(repository.get_files()) == 4
+    assert len(repository.get_files(item_id="item-1")) == 3
+    assert len(repository.get_files(item_id="item-1", skip=1, limit=1)) == 1
+    assert repository.get_file(files[1].file_id) is files[1]
+    assert len(repository.get_file_instances(file_id=files[0].file_id)) == 2
+    assert repository.get_file_instances(file_id=files[1].file_id) == []
+
+
+def test_create_file_instances_bulk_inserts_rows(repository, tmp_path):
+    """Test that bulk rows are completed with ids and checksums and inserted."""
+    filepath = tmp_path / "data.txt"
+    filepath.write_bytes(b"hello mollusk")
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+    rows = [
+        {
+            "file_id": file.file_id,
+            "storage_class": "POSIXStorage",
+            "uri": f"file://{filepath}",
+        },
+        {
+            "file_id": file.file_id,
+            "storage_class": "POSIXStorage",
+            "uri": "file:///missing",
+            "checksum": "sha256:given",
+        },
+    ]
+
+    repository.create_file_instances_bulk(rows, max_workers=1)
+
+    expected = hashlib.sha256(b"hello mollusk").hexdigest()
+    assert rows[0]["checksum"] == f"sha256:{expected}"
+    file_instances = repository.get_file_instances(file_id=file.file_id)
+    assert {file_instance.file_instance_id for file_instance in file_instances} == {
+        row["file_instance_id"] for row in rows
+    }
+    checksums = {file_instance.checksum for file_instance in file_instances}
+    assert checksums == {f"sha256:{expected}", "sha256:given"}
+
+
+def test_file_ids_are_stored_as_binary_uuids(repository):
+    """Test that file ids round-trip as UUIDs stored in 16 bytes."""
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+    file_instance = repository.create_file_instance(
+        file.file_id, "POSIXStorage", "file:///tmp/data.txt", checksum="abc"
+    )
+    assert isinstance(file.file_id, uuid.UUID)
+    repository.session.expunge_all()
+
+    assert repository.get_file(str(file.file_id)).file_id == file.file_id
+    instance = repository.get_file_instances(file_id=str(file.file_id))[0]
+    assert instance.file_instance_id == file_instance.file_instance_id
+    stored = repository.session.execute(text("SELECT file_id FROM file")).scalar()
+    assert stored == file.file_id.bytes
+
+
+def test_delete_item_removes_files_and_instances(repository):
+    """Test that deleting an item deletes its files and their instances."""
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+    file_instance = repository.create_file_instance(
+        file.file_id, "POSIXStorage", "file:///tmp/data.txt", checksum="abc"
+    )
+    repository.create_item("item-2", "Item 2")
+    other = repository.create_file("item-2", "other.txt")
+
+    assert repository.delete_item("item-1")
+    assert not repository.delete_item("item-1")
+    assert repository.get_item("item-1") is None
+    assert repository.get_file(file.file_id) is None
+    assert repository.get_file_instance(file_instance.file_instance_id) is None
+    assert repository.get_files() == [other]
+
+
+def test_delete_file_and_file_instance(repository):
+    """Test that delete_file removes instances and deletes report whether rows went."""
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+    first, second = (
+        repository.create_file_instance(
+            file.file_id, "POSIXStorage", f"file:///tmp/{i}", checksum="abc"
+        )
+        for i in range(2)
+    )
+
+    assert repository.delete_file_instance(first.file_instance_id)
+    assert repository.delete_file(file.file_id)
+    assert not repository.delete_file_instance(second.file_instance_id)
+    assert repository.get_file_instances() == []
+
+
+def test_delete_by_string_id_removes_loaded_objects(repository):
+    """Test that deleting by a string id also drops the object from the session."""
+    repository.create_item("item-1", "Item 1")
+    file = repository.create_file("item-1", "data.txt")
+    file_instance = repository.create_file_instance(
+        file.file_id, "POSIXStorage", "file:///tmp/data.txt", checksum="abc"
+    )
+
+    assert repository.delete_file_instance(str(file_instance.file_instance_id))
+    assert repository.get_file_instance(file_instance.file_instance_id) is None
+    assert repository.delete_file(str(file.file_id))
+    assert repository.get_file(file.file_id) is None
+
+
+def test_import_keeps_application_mimetypes():
+    """Test that importing the repository keeps types the application registered."""
+    code = (
+        "import mimetypes; mimetypes.add_type('application/x-app-custom', '.appx1'); "
+        "import mollusk.repository; print(mimetypes.guess_type('a.appx1')[0])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "application/x-app-custom"
+
+
+def test_malformed_file_ids_are_not_found(repository):
+    """Test that ids which are not UUIDs behave like ids that do not exist."""
+    assert repository.get_file("not-a-uuid") is None
+    assert repository.update_file("not-a-uuid", filename="x") is None
+    assert not repository.delete_file("not-a-uuid")
+    assert repository.get_file_instance("not-a-uuid") is None
+    assert repository.update_file_instance("not-a-uuid", uri="x") is None
+    assert not repository.delete_file_instance("not-a-uuid")
+    assert repository.get_file_instances(file_id="not-a-uuid") == []
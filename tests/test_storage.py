@@ -0,0 +1,465 @@
+"""Tests for storage backends."""
+
+import base64
+import hashlib
+import io
+import mmap
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+from mollusk import storage as storage_module
+from mollusk.models import FileInstance
+from mollusk.storage import (
+    MMAP_SLICE_SIZE,
+    MMAP_THRESHOLD,
+    STORAGE_REGISTRY,
+    POSIXStorage,
+    S3Storage,
+)
+
+
+def test_posix_calculate_checksum(tmp_path):
+    """Test that POSIXStorage calculates a SHA256 hexdigest of the file contents."""
+    filepath = tmp_path / "data.bin"
+    data = b"mollusk" * 100_000
+    filepath.write_bytes(data)
+
+    storage = POSIXStorage(f"file://{filepath}")
+    assert storage.calculate_checksum() == hashlib.sha256(data).hexdigest()
+    assert storage.calculate_checksum("MD5") == hashlib.md5(data).hexdigest()  # noqa: S324
+
+
+def test_posix_calculate_checksum_blake3(tmp_path):
+    """Test that POSIXStorage supports BLAKE3 when the package is installed."""
+    blake3 = pytest.importorskip("blake3")
+    filepath = tmp_path / "data.bin"
+    data = b"mollusk" * 100_000
+    filepath.write_bytes(data)
+
+    storage = POSIXStorage(f"file://{filepath}")
+    assert storage.calculate_checksum("BLAKE3") == blake3.blake3(data).hexdigest()
+
+
+def test_posix_calculate_checksum_large_file(tmp_path):
+    """Test that files above the mmap threshold hash to the same digest."""
+    filepath = tmp_path / "large.bin"
+    data = bytes(range(256)) * ((MMAP_SLICE_SIZE + MMAP_THRESHOLD) // 256 + 7)
+    filepath.write_bytes(data)
+
+    storage = POSIXStorage(f"file://{filepath}")
+    assert storage.calculate_checksum() == hashlib.sha256(data).hexdigest()
+
+
+def test_s3_write_small_data_uses_single_put():
+    """Test that S3Storage writes small payloads with a single checksummed PUT."""
+    digest = hashlib.sha256(b"hello mollusk").digest()
+    storage = S3Storage("s3://bucket/path/to/key.txt")
+    with Stubber(storage.s3) as stubber:
+        stubber.add_response(
+            "put_object",
+            {"ETag": '"written"'},
+            {
+                "Bucket": "bucket",
+                "Key": "path/to/key.txt",
+                "Body": b"hello mollusk",
+                "ChecksumAlgorithm": "SHA256",
+                "ChecksumSHA256": base64.b64encode(digest).decode("ascii"),
+            },
+        )
+        assert storage.write("hello mollusk")
+        stubber.assert_no_pending_responses()
+        assert storage.get_checksum() == digest.hex()
+
+
+def test_s3_stream_yields_byte_ranges():
+    """Test that S3Storage.stream fetches the object in ordered byte ranges."""
+    data = b"0123456789"
+    storage = S3Storage("s3://bucket/key")
+    with Stubber(storage.s3) as stubber:
+        stubber.add_response(
+            "head_object",
+            {"ContentLength": len(data)},
+            {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"},
+        )
+        for start, end in ((0, 3), (4, 7), (8, 9)):
+            chunk = data[start : end + 1]
+            stubber.add_response(
+                "get_object",
+                {"Body": StreamingBody(io.BytesIO(chunk), len(chunk))},
+                {"Bucket": "bucket", "Key": "key", "Range": f"bytes={start}-{end}"},
+            )
+        chunks = storage.stream(chunk_size=4, concurrency=1)
+        assert list(chunks) == [b"0123", b"4567", b"89"]
+
+
+def test_s3_calculate_checksum_uses_existing_checksum():
+    """Test that an object's stored checksum is returned without a self-copy."""
+    digest = hashlib.sha256(b"hello mollusk").digest()
+    storage = S3Storage("s3://bucket/key")
+    with Stubber(storage.s3) as stubber:
+        stubber.add_response(
+            "head_object",
+            {
+                "ETag": '"existing"',
+                "ChecksumSHA256": base64.b64encode(digest).decode("ascii"),
+            },
+            {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"},
+        )
+        assert storage.calculate_checksum() == digest.hex()
+        assert storage.get_checksum() == digest.hex()
+        stubber.assert_no_pending_responses()
+
+
+def test_posix_write_caches_checksum(tmp_path, monkeypatch):
+    """Test that write() hashes the data so get_checksum() needn't re-read the file."""
+    filepath = tmp_path / "data.txt"
+    storage = POSIXStorage(f"file://{filepath}")
+    assert storage.write("hello mollusk")
+    assert filepath.read_bytes() == b"hello mollusk"
+
+    expected = hashlib.sha256(b"hello mollusk").hexdigest()
+    with monkeypatch.context() as m:
+        m.setattr(hashlib, "new", None)
+        assert storage.get_checksum() == expected
+
+    filepath.write_bytes(b"changed elsewhere")
+    assert storage.get_checksum() == hashlib.sha256(b"changed elsewhere").hexdigest()
+    filepath.unlink()
+    with pytest.raises(FileNotFoundError):
+        storage.get_checksum()
+
+
+def test_s3_parses_bucket_and_key():
+    """Test that S3Storage splits its URI into bucket and key."""
+    storage = S3Storage("s3://bucket/path/to/key.txt")
+    assert storage.bucket == "bucket"
+    assert storage.key == "path/to/key.txt"
+    with pytest.raises(ValueError, match="s3://"):
+        S3Storage("file:///tmp/key.txt")
+
+    class URI(str):
+        __slots__ = ()
+
+    with pytest.raises(ValueError, match="s3://"):
+        S3Storage(URI("file:///tmp/key.txt"))
+
+
+def test_storage_registry_includes_subclasses():
+    """Test that storage subclasses register by class name and short name."""
+    assert STORAGE_REGISTRY["POSIXStorage"] is POSIXStorage
+    assert STORAGE_REGISTRY["S3Storage"] is S3Storage
+    assert STORAGE_REGISTRY["posix"] is POSIXStorage
+    assert STORAGE_REGISTRY["s3"] is S3Storage
+
+
+def test_storage_subclass_does_not_inherit_short_name(monkeypatch):
+    """Test that a subclass without its own name leaves the parent's short name."""
+    registry = dict(STORAGE_REGISTRY)
+    monkeypatch.setattr(storage_module, "STORAGE_REGISTRY", registry)
+
+    class VerboseStorage(POSIXStorage):
+        pass
+
+    class NamedStorage(POSIXStorage):
+        name = "named"
+
+    assert registry["posix"] is POSIXStorage
+    assert registry["VerboseStorage"] is VerboseStorage
+    assert registry["named"] is NamedStorage
+
+
+def test_posix_calculate_checksum_without_mmap(tmp_path, monkeypatch):
+    """Test that large files hash correctly when mmap is unavailable."""
+    filepath = tmp_path / "large.bin"
+    data = bytes(range(256)) * (MMAP_THRESHOLD // 256 * 3 + 7)
+    filepath.write_bytes(data)
+
+    def unsupported(*args, **kwargs):
+        raise OSError
+
+    monkeypatch.setattr(mmap, "mmap", unsupported)
+    storage = POSIXStorage(f"file://{filepath}")
+    assert storage.calculate_checksum() == hashlib.sha256(data).hexdigest()
+
+
+def test_s3_exists_many():
+    """Test that exists_many returns one boolean per storage, in order."""
+    storages = [S3Storage("s3://bucket/present"), S3Storage("s3://bucket/missing")]
+    with Stubber(storages[0].s3) as stubber:
+        stubber.add_response("head_object", {}, {"Bucket": "bucket", "Key": "present"})
+        stubber.add_client_error(
+            "head_object",
+            service_error_code="404",
+            http_status_code=404,
+            expected_params={"Bucket": "bucket", "Key": "missing"},
+        )
+        assert S3Storage.exists_many(storages, concurrency=1) == [True, False]
+
+
+def test_posix_calculate_checksums_single_pass(tmp_path):
+    """Test that several algorithms are calculated together for large files."""
+    filepath = tmp_path / "large.bin"
+    data = bytes(range(256)) * (MMAP_SLICE_SIZE // 256 + 7)
+    filepath.write_bytes(data)
+
+    storage = POSIXStorage(f"file://{filepath}")
+    assert storage.calculate_checksums(("MD5", "SHA256")) == {
+        "MD5": hashlib.md5(data).hexdigest(),  # noqa: S324
+        "SHA256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def test_posix_copy_to(tmp_path):
+    """Test that copy_to copies file contents to another POSIX location."""
+    data = bytes(range(256)) * 4096
+    source_path = tmp_path / "source.bin"
+    source_path.write_bytes(data)
+    destination_path = tmp_path / "destination.bin"
+
+    source = POSIXStorage(f"file://{source_path}")
+    destination = POSIXStorage(f"file://{destination_path}")
+    assert source.copy_to(destination)
+    assert destination_path.read_bytes() == data
+
+
+def test_posix_copy_to_same_file_raises(tmp_path):
+    """Test that copying a file onto itself raises instead of truncating it."""
+    data = bytes(range(256)) * 4
+    source_path = tmp_path / "source.bin"
+    source_path.write_bytes(data)
+    (tmp_path / "link.bin").symlink_to(source_path)
+
+    source = POSIXStorage(f"file://{source_path}")
+    for uri in (f"file://{source_path}", f"file://{tmp_path / 'link.bin'}"):
+        with pytest.raises(shutil.SameFileError):
+            source.copy_to(POSIXStorage(uri))
+    assert source_path.read_bytes() == data
+
+
+def test_s3_calculate_checksum_streaming():
+    """Test that the checksum can be calculated locally from ranged GETs."""
+    data = b"hello mollusk"
+    storage = S3Storage("s3://bucket/key")
+    with Stubber(storage.s3) as stubber:
+        stubber.add_response(
+            "head_object",
+            {"ContentLength": len(data), "ETag": '"streamed"'},
+            {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"},
+        )
+        stubber.add_response(
+            "get_object",
+            {"Body": StreamingBody(io.BytesIO(data), len(data))},
+            {"Bucket": "bucket", "Key": "key", "Range": f"bytes=0-{len(data) - 1}"},
+        )
+        checksum = storage.calculate_checksum(server_side=False)
+        assert checksum == hashlib.sha256(data).hexdigest()
+
+        # the same object version is not downloaded again
+        stubber.add_response(
+            "head_object",
+            {"ContentLength": len(data), "ETag": '"streamed"'},
+            {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"},
+        )
+        other = S3Storage("s3://bucket/key")
+        assert other.calculate_checksum(server_side=False) == checksum
+        stubber.assert_no_pending_responses()
+
+
+def test_posix_write_with_unknown_algorithm_keeps_file(tmp_path):
+    """Test that an unsupported checksum algorithm fails before the file is touched."""
+    filepath = tmp_path / "data.txt"
+    filepath.write_bytes(b"original")
+    storage = POSIXStorage(f"file://{filepath}")
+    with pytest.raises(ValueError, match="unsupported"):
+        storage.write(b"replacement", compute_checksum="NOT-A-HASH")
+    assert filepath.read_bytes() == b"original"
+
+
+def test_posix_write_if_absent(tmp_path):
+    """Test that write_if_absent does not overwrite an existing file."""
+    filepath = tmp_path / "data.txt"
+    storage = POSIXStorage(f"file://{filepath}")
+    assert storage.write_if_absent(b"first")
+    assert not storage.write_if_absent(b"second")
+    assert filepath.read_bytes() == b"first"
+
+
+def test_s3_write_if_absent_existing_object():
+    """Test that a failed conditional PUT reports the object as already present."""
+    digest = hashlib.sha256(b"data").digest()
+    storage = S3Storage("s3://bucket/key")
+    with Stubber(storage.s3) as stubber:
+        stubber.add_client_error(
+            "put_object",
+            service_error_code="PreconditionFailed",
+            http_status_code=412,
+            expected_params={
+                "Bucket": "bucket",
+                "Key": "key",
+                "Body": b"data",
+                "ChecksumAlgorithm": "SHA256",
+                "ChecksumSHA256": base64.b64encode(digest).decode("ascii"),
+                "IfNoneMatch": "*",
+            },
+        )
+        assert not storage.write_if_absent(b"data")
+
+
+def test_s3_client_shared_per_region():
+    """Test that S3Storage instances reuse one client per region and endpoint."""
+    first = S3Storage("s3://bucket/a")
+    second = S3Storage("s3://bucket/b")
+    other_region = S3Storage("s3://bucket/c", region_name="eu-west-1")
+    assert first.s3 is second.s3
+    assert other_region.s3 is not first.s3
+    assert other_region.s3.meta.region_name == "eu-west-1"
+
+
+def test_posix_calculate_checksum_cached_until_file_changes(tmp_path, monkeypatch):
+    """Test that an unchanged file's checksum is remembered and a changed one isn't."""
+    filepath = tmp_path / "data.txt"
+    filepath.write_bytes(b"hello mollusk")
+    storage = POSIXStorage(f"file://{filepath}")
+    expected = hashlib.sha256(b"hello mollusk").hexdigest()
+    assert storage.calculate_checksum() == expected
+
+    with monkeypatch.context() as m:
+        m.setattr(hashlib, "new", None)
+        assert POSIXStorage(f"file://{filepath}").calculate_checksum() == expected
+
+    filepath.write_bytes(b"goodbye mollusk")
+    assert storage.calculate_checksum() == hashlib.sha256(b"goodbye mollusk").hexdigest()
+
+
+def test_s3_read_small_object_after_head_uses_single_get():
+    """Test that a small object already sized by a HEAD is read with one GET."""
+    data = b"hello mollusk"
+    storage = S3Storage("s3://bucket/key")
+    with Stubber(storage.s3) as stubber:
+        stubber.add_response(
+            "head_object",
+            {"ContentLength": len(data), "ETag": '"small"'},
+            {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"},
+        )
+        stubber.add_response(
+            "get_object",
+            {"Body": StreamingBody(io.BytesIO(data), len(data))},
+            {"Bucket": "bucket", "Key": "key"},
+        )
+        assert storage.etag() == "small"
+        assert storage.read() == data
+        stubber.assert_no_pending_responses()
+
+
+def test_file_instance_verified_checksum_rereads_s3_etag():
+    """Test that a FileInstance re-reads the S3 ETag rather than a cached HEAD."""
+    first = hashlib.sha256(b"v1").digest()
+    second = hashlib.sha256(b"v2").digest()
+    file_instance = FileInstance(storage_class="S3Storage", uri="s3://bucket/key")
+    with Stubber(file_instance.storage.s3) as stubber:
+        for etag, digest in (("v1", first), ("v2", second)):
+            stubber.add_response(
+                "head_object",
+                {
+                    "ETag": f'"{etag}"',
+                    "ChecksumSHA256": base64.b64encode(digest).decode("ascii"),
+                },
+                {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"},
+            )
+        assert file_instance.compute_checksum() == f"sha256:{first.hex()}"
+        assert file_instance.etag == "v1"
+        assert file_instance.verified_checksum() == f"sha256:{second.hex()}"
+        assert file_instance.etag == "v2"
+        stubber.assert_no_pending_responses()
+
+
+def test_s3_calculate_checksum_ignores_composite_checksum():
+    """Test that a multipart upload's checksum of part checksums is not returned."""
+    data = b"hello mollusk"
+    part_checksum = base64.b64encode(hashlib.sha256(b"parts").digest()).decode("ascii")
+    storage = S3Storage("s3://bucket/composite")
+    with Stubber(storage.s3) as stubber:
+        stubber.add_response(
+            "head_object",
+            {
+                "ContentLength": len(data),
+                "ETag": '"composite"',
+                "ChecksumSHA256": f"{part_checksum}-2",
+                "ChecksumType": "COMPOSITE",
+            },
+            {"Bucket": "bucket", "Key": "composite", "ChecksumMode": "ENABLED"},
+        )
+        stubber.add_response(
+            "get_object",
+            {"Body": StreamingBody(io.BytesIO(data), len(data))},
+            {"Bucket": "bucket", "Key": "composite", "Range": f"bytes=0-{len(data) - 1}"},
+        )
+        with pytest.raises(ValueError, match="full-object"):
+            storage.get_checksum()
+        checksum = storage.calculate_checksum(server_side=False)
+        assert checksum == hashlib.sha256(data).hexdigest()
+        stubber.assert_no_pending_responses()
+
+
+def test_s3_failed_write_does_not_cache_checksum():
+    """Test that a checksum is only cached once the upload has succeeded."""
+    storage = S3Storage("s3://bucket/key")
+    with Stubber(storage.s3) as stubber:
+        stubber.add_client_error(
+            "put_object", service_error_code="InternalError", http_status_code=500
+        )
+        stubber.add_response(
+            "head_object",
+            {"ETag": '"other"'},
+            {"Bucket": "bucket", "Key": "key", "ChecksumMode": "ENABLED"},
+        )
+        with pytest.raises(storage.s3.exceptions.ClientError):
+            storage.write(b"never stored")
+        with pytest.raises(ValueError, match="checksum"):
+            storage.get_checksum()
+        stubber.assert_no_pending_responses()
+
+
+def test_s3_client_built_once_under_concurrent_misses(monkeypatch):
+    """Test that threads missing the client cache together build a single client."""
+    builds = []
+
+    def build(region_name, endpoint_url):
+        builds.append(region_name)
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setattr(storage_module, "_S3_CLIENTS", {})
+    monkeypatch.setattr(storage_module, "_new_s3_client", build)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        s3_client = storage_module._s3_client  # noqa: SLF001
+        clients = list(executor.map(s3_client, ["eu-west-1"] * 4))
+    assert len(builds) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_file_instance_verified_checksum_after_s3_overwrite():
+    """Test that a checksum cached by write() is not reused once the object changes."""
+    v1, v2 = hashlib.sha256(b"v1").digest(), hashlib.sha256(b"v2").digest()
+    file_instance = FileInstance(storage_class="S3Storage", uri="s3://bucket/overwritten")
+    params = {"Bucket": "bucket", "Key": "overwritten"}
+    with Stubber(file_instance.storage.s3) as stubber:
+        stubber.add_response("put_object", {"ETag": '"e1"'})
+        stubber.add_response(
+            "head_object",
+            {"ETag": '"e2"', "ChecksumSHA256": base64.b64encode(v2).decode("ascii")},
+            {**params, "ChecksumMode": "ENABLED"},
+        )
+        assert file_instance.storage.write(b"v1")
+        assert file_instance.compute_checksum() == f"sha256:{v1.hex()}"
+        assert file_instance.etag == "e1"
+
+        # another writer replaces the object, changing its ETag to e2
+        assert file_instance.verified_checksum() == f"sha256:{v2.hex()}"
+        assert file_instance.etag == "e2"
+        stubber.assert_no_pending_responses()